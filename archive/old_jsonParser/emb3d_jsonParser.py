@@ -10,109 +10,213 @@ Description:
     - Extracts Mitigations (MID) with descriptions
     - Maps PIDs --> TIDs and TIDs --> MIDs
     - Optional Excel formatting with `-Format` flag
+    - Optional normalized 3-sheet workbook with `-Normalized` flag (no repeated text)
+    - Installs missing dependencies with `--install-deps`
 
 Usage:
-    python3 emb3d_jsonParser.py [-Format]
+    python3 emb3d_jsonParser.py [-Format | -Normalized] [--install-deps]
 
 Dependencies:
-    - pandas
     - requests
-    - openpyxl
+    - xlsxwriter
+    - orjson (optional, falls back to json)
+    - ijson (optional, only used when orjson is missing)
 """
 
 # Import libraries
 import os # Provides functions for interacting with the operating system
 import sys # Used for system-specific parameters and functions like command-line arguments
+from sys import intern # Collapses repeated ID/description strings into one shared object
+import io # Wraps downloaded bytes as a file for the streaming parser
 import json # Deals with JSON data
+import hashlib # Hashes URLs and inputs into cache file names
+import pickle # Stores parsed rows between runs
+from itertools import groupby # Groups adjacent equal values into merge runs
+from operator import itemgetter # Picks one column out of each row tuple
+from importlib.util import find_spec # Checks whether a package is installed without importing it
+import queue # Hands rows from the parser to the background Excel writer
+import threading # Runs the Excel writer next to the parser
 import subprocess # Allows execution of system commands to install missing dependencies
-import requests # Handles HTTP requests used to fetch JSON data from GitHub
-import pandas as pd # Data manipulation and analysis library for creating and saving DataFrames)
-from openpyxl import load_workbook # For Excel workbook formatting
-from openpyxl.styles import Font, Alignment # Allows text formatting (e.g., bold headers, centered text)
-from openpyxl.utils import get_column_letter # For converting column numbers to Excel column letters (e.g., 1 to 'A')
+from functools import lru_cache # Memoizes downloads within a single run
+from pathlib import Path # Filesystem paths for the download cache
+from concurrent.futures import ThreadPoolExecutor # Runs the three GitHub downloads concurrently
+
+# Max batches (one per threat) waiting for the background Excel writer
+WRITE_QUEUE_BATCHES = 1024
+
+# Column headers for the normalized (-Normalized) workbook, one entry per sheet
+NORMALIZED_COLUMNS = {
+    "Properties": ("Property ID (PID)", "Property Description"),
+    "Threats": ("Property ID (PID)", "Threat ID (TID)", "Threat Description"),
+    "Mitigations": ("Threat ID (TID)", "Mitigation ID (MID)", "Mitigation Description"),
+}
+
+# Column headers for the Excel output, in row tuple order (rows are plain tuples, never dicts keyed by these)
+COLUMNS = ("Property ID (PID)", "Property Description", "Threat ID (TID)", "Threat Description", "Mitigation ID (MID)", "Mitigation Description")
 
 # List of required external Python packages
-REQUIRED_PACKAGES = ["pandas", "requests", "openpyxl"]
+REQUIRED_PACKAGES = ["requests", "xlsxwriter", "orjson"]
 
 # Function to check required packages/dependencies
 def check_and_install_dependencies():
     # Check for missing Python packages and install them if necessary.
-    missing_packages = []
-
-    # Check if each required package is installed
-    for package in REQUIRED_PACKAGES:
-        try:
-            __import__(package)  # Attempt to import the package
-        except ImportError:
-            missing_packages.append(package)  # If missing, add to the list
+    # find_spec only asks the import system where the package lives, it doesn't run its __init__
+    missing_packages = [package for package in REQUIRED_PACKAGES if find_spec(package) is None]
 
     # Install missing packages using pip
     if missing_packages:
         print(f"Installing missing dependencies: {', '.join(missing_packages)}")
         subprocess.run([sys.executable, "-m", "pip", "install"] + missing_packages, check=True)
 
-# Ensure all dependencies are installed before proceeding
-check_and_install_dependencies()
+# Only check/install dependencies when asked to, so normal runs don't pay for it (or spawn pip) on every start.
+# This runs before the third-party imports below so a fresh install can still import them.
+if "--install-deps" in sys.argv:
+    check_and_install_dependencies()
+
+import requests # Handles HTTP requests used to fetch JSON data from GitHub
+from requests.adapters import HTTPAdapter # Sizes the session's connection pool
+import xlsxwriter # Writes the workbook, with native formats/merges for -Format
 
 # URLs for the MITRE EMB3D JSON files on their github
 THREATS_JSON_URL = "https://raw.githubusercontent.com/mitre/emb3d/main/_data/threats.json"
 MITIGATIONS_JSON_URL = "https://raw.githubusercontent.com/mitre/emb3d/main/_data/mitigations_threat_mappings.json"
 PROPERTIES_JSON_URL = "https://raw.githubusercontent.com/mitre/emb3d/main/_data/properties_threat_mappings.json"
 
+# Optional faster JSON decoder, falls back to the standard library if it isn't installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# Optional streaming JSON parser, only without orjson: a full orjson parse of bytes already in memory beats streaming them
+ijson = None
+if json_loads is json.loads:
+    try:
+        import ijson
+    except ImportError:
+        pass
+
+# Downloaded JSON and its ETag are kept here so unchanged files are revalidated instead of re-downloaded
+CACHE_DIR = Path.home() / ".cache" / "emb3d"
+
+# Bump when the parsers' output changes so older pickled results in CACHE_DIR are ignored
+PARSE_CACHE_VERSION = 1
+
+# Shared session so the downloads reuse the keep-alive connection to GitHub (safe across threads for plain GETs)
+# Pool holds one connection per concurrent download and asks for gzip so less JSON crosses the wire
+SESSION = requests.Session()
+SESSION.headers["Accept-Encoding"] = "gzip"
+SESSION.mount("https://", HTTPAdapter(pool_connections=3, pool_maxsize=3))
+
+# Function to write a file atomically (readers see the old or the new contents, never half of it)
+def write_atomic(path, data):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)  # Atomic rename on the same filesystem
+
+# Function to persist a downloaded body and its ETag in the cache
+def save_cached_response(cache_file, etag_file, body, etag):
+    # The old ETag is dropped first and the new one written last, so an interrupted run
+    # can never pair an ETag with the wrong (or a partial) body; worst case the next run downloads again.
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        etag_file.unlink(missing_ok=True)
+        write_atomic(cache_file, body)
+        write_atomic(etag_file, etag.encode())
+    except OSError as e:
+        print(f"Warning: could not update cache: {e}")  # Caching is best-effort, the download itself succeeded
+
 # Function to fetch .json from MITRE EMB3D github
-def fetch_json_from_github(url):
-    # Fetch JSON data from a given GitHub URL.
+@lru_cache(maxsize=None)
+def fetch_from_github(url):
+    # Fetch the raw JSON bytes from a given GitHub URL, revalidating the on-disk copy with its ETag.
+    cache_file = CACHE_DIR / f"{hashlib.sha1(url.encode()).hexdigest()}.json"
+    etag_file = cache_file.with_suffix(".etag")
+    headers = {}
+    if cache_file.exists() and etag_file.exists():
+        headers["If-None-Match"] = etag_file.read_text().strip()  # Ask GitHub to answer 304 if nothing changed
+
     try:
-        response = requests.get(url, timeout=10)  # Send GET request with a timeout
+        response = SESSION.get(url, headers=headers, timeout=10)  # Send GET request with a timeout
         response.raise_for_status()  # Raise exception if request fails
-        return response.json()  # Return the parsed JSON data
+        if response.status_code == 304:
+            return cache_file.read_bytes()  # Unchanged upstream, use the cached copy
+
+        # Save the body and its ETag for the next run
+        if response.headers.get("ETag"):
+            save_cached_response(cache_file, etag_file, response.content, response.headers["ETag"])
+        return response.content  # Return the raw JSON data
     except requests.exceptions.RequestException as e:
         print(f"Error fetching file: {e}")
         return None  # Return None if an error occurs
 
 # Function to open/load local .json file(s) if you want to download them locally
-def load_local_json(file_path):
-    # Load JSON data from a local file.
+def load_local_file(file_path):
+    # Load the raw JSON bytes from a local file.
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            return json.load(file)  # Read and parse JSON data
-    except (FileNotFoundError, json.JSONDecodeError) as e:
+        with open(file_path, "rb") as file:
+            return file.read()
+    except FileNotFoundError as e:
         print(f"Error loading file: {e}")
         return None  # Return None if an error occurs
 
+# Function to parse raw JSON bytes into Python objects
+def decode_json(raw):
+    # Both decoders take UTF-8 bytes directly.
+    try:
+        return json_loads(raw)
+    except json.JSONDecodeError as e:
+        print(f"Error parsing JSON: {e}")
+        return None  # Return None if an error occurs
+
+# Function to iterate the objects in one top-level JSON array
+def iter_json_items(raw, key):
+    # Without orjson, ijson streams the array straight from the bytes instead of building the whole document with json.
+    if ijson is not None:
+        return ijson.items(io.BytesIO(raw), f"{key}.item")
+    return decode_json(raw).get(key, [])
+
+# Function to intern a string read from the JSON
+def intern_str(value):
+    # sys.intern only accepts str; a null or numeric value is passed through unchanged, as it was before interning
+    return intern(value) if isinstance(value, str) else value
+
 # Function to parse the properties from JSON
-def parse_properties(json_data):
+def parse_properties(raw):
     # Extracts and returns a dictionary mapping Property IDs (PID) to their descriptions.
-    return {p.get("id", "Unknown PID"): p.get("text", "No description available") for p in json_data.get("properties", [])}
+    # Entries without an ID can't be referenced by a threat, so they're skipped rather than stored under a placeholder
+    # Rows already share one object per dict value; interning only merges the copies that repeat across threats
+    # (each threat's PID/MID references, and identical texts under different IDs)
+    return {intern_str(p["id"]): intern_str(p.get("text", "No description available")) for p in iter_json_items(raw, "properties") if "id" in p}
 
 # Function to parse the mitigations from JSON
-def parse_mitigations(json_data):
+def parse_mitigations(raw):
     # Extracts and returns a dictionary mapping Mitigation IDs (MID) to their descriptions.
-    return {m.get("id", "Unknown MID"): m.get("text", "No description available") for m in json_data.get("mitigations", [])}
+    return {intern_str(m["id"]): intern_str(m.get("text", "No description available")) for m in iter_json_items(raw, "mitigations") if "id" in m}
 
 # Function to parse the threats from JSON
-def parse_threats(json_data, mitigation_dict, property_dict):
+def parse_threats(json_data, mitigation_dict, property_dict, on_rows=None):
     
     # Extracts threats from JSON and structures them for Excel output.
     # Maps properties (PID) and mitigations (MID) to threats (TID).
+    # If on_rows is given it's called with each threat's rows as soon as they're built (see start_background_writer).
     data_list = []
+
+    # Bind the lookups once instead of resolving the .get attribute on every iteration
+    property_text = property_dict.get
+    mitigation_text = mitigation_dict.get
     
     # Loop through each threat entry in JSON
     for threat in json_data.get("threats", []):
-        tid = threat.get("id", "Unknown TID")  # Extract Threat ID
-        tid_text = threat.get("text", "No description available")  # Extract Threat Description
-        properties = threat.get("properties", [])  # Get associated properties
+        threat_get = threat.get
+        tid = intern_str(threat["id"])  # Extract Threat ID (always present in MITRE's schema)
+        tid_text = intern_str(threat_get("text", "No description available"))  # Extract Threat Description
         
-        # List for property info
-        property_data = []
-        # Extract Property IDs and Descriptions
-        for prop in properties:
-            pid = prop.get("id", "Unknown PID") # Extract Property ID
-            pid_text = property_dict.get(pid, "No description available") # Extract Property Description
-            property_data.append((pid, pid_text))
+        # Extract Property IDs and Descriptions (each ID is read once, then reused for the description lookup)
+        property_data = [(pid, property_text(pid, "No description available")) for pid in (intern_str(prop["id"]) for prop in threat_get("properties", []))]
 
         # Extract Mitigation IDs and Descriptions
-        mitigations = [(m.get("id", "Unknown MID"), mitigation_dict.get(m.get("id", "Unknown MID"), "No description available")) for m in threat.get("mitigations", [])]
+        mitigations = [(mid, mitigation_text(mid, "No description available")) for mid in (intern_str(m["id"]) for m in threat_get("mitigations", []))]
 
         # Ensure each threat has at least one property and one mitigation
         if not property_data:
@@ -120,78 +224,178 @@ def parse_threats(json_data, mitigation_dict, property_dict):
         if not mitigations:
             mitigations = [("None", "No mitigation available")]
 
-        # Create structured data for Excel output
-        for pid, pid_text in property_data:
-            for mid, mid_text in mitigations:
-                data_list.append({
-                    "Property ID (PID)": pid,
-                    "Property Description": pid_text,  
-                    "Threat ID (TID)": tid,
-                    "Threat Description": tid_text,
-                    "Mitigation ID (MID)": mid,
-                    "Mitigation Description": mid_text
-                })
+        # Create structured data for Excel output (one row tuple per PID x MID pair)
+        rows = [(pid, pid_text, tid, tid_text, mid, mid_text) for pid, pid_text in property_data for mid, mid_text in mitigations]
+        data_list.extend(rows)
+        if on_rows is not None:
+            on_rows(rows)
     
     return data_list
 
+# Function to parse the threats into normalized sheets instead of the flattened PID x MID product
+def parse_threats_normalized(json_data, mitigation_dict, property_dict):
+
+    # Each description is stored once per link instead of once per PID x MID combination.
+    # Threats link back to their PIDs and Mitigations link back to their TIDs.
+    threat_rows = []
+    mitigation_rows = []
+
+    # Loop through each threat entry in JSON
+    for threat in json_data.get("threats", []):
+        tid = threat["id"]  # Extract Threat ID (always present in MITRE's schema)
+        tid_text = threat.get("text", "No description available")  # Extract Threat Description
+
+        # Same placeholders as parse_threats when a threat has no property or mitigation
+        pids = [prop["id"] for prop in threat.get("properties", [])] or ["None"]
+        threat_rows.extend((pid, tid, tid_text) for pid in pids)
+
+        mids = [m["id"] for m in threat.get("mitigations", [])]
+        if mids:
+            mitigation_rows.extend((tid, mid, mitigation_dict.get(mid, "No description available")) for mid in mids)
+        else:
+            mitigation_rows.append((tid, "None", "No mitigation available"))
+
+    property_rows = list(property_dict.items())
+    return {"Properties": property_rows, "Threats": threat_rows, "Mitigations": mitigation_rows}
+
+# Function to reuse the parsed rows from a previous run when the inputs haven't changed
+def cached_parse(kind, raw_inputs, parse):
+    # Returns (result, cache_hit); parse() is only called on a miss.
+    # The key hashes the raw JSON bytes (works for downloads and local files alike) plus the output kind and cache version.
+    if any(raw is None for raw in raw_inputs):
+        return parse(), False  # A failed fetch/load has nothing to key on
+    digest = hashlib.sha1(f"{PARSE_CACHE_VERSION}:{kind}".encode())
+    for raw in raw_inputs:
+        digest.update(hashlib.sha1(raw).digest())
+    pickle_file = CACHE_DIR / f"{digest.hexdigest()}.pkl"
+
+    try:
+        return pickle.loads(pickle_file.read_bytes()), True
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass  # No usable cached result, parse below
+
+    result = parse()
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        write_atomic(pickle_file, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError as e:
+        print(f"Warning: could not update cache: {e}")
+    return result, False
+
+# Columns to merge vertically (1-based Excel column: justification)
+MERGE_COLUMNS = {
+    1: "center",  # Property ID (PID)
+    2: "left",    # Property Description
+    3: "center",  # Threat ID (TID)
+    4: "left",    # Threat Description
+    6: "center",  # Mitigation ID (MID)
+}
+
+# Function to find runs of repeated values in the merged columns
+def merge_runs(rows):
+    # Returns {column_idx: (justify, [(first_row, last_row), ...])} in Excel row numbers.
+    # parse_threats emits rows grouped by threat, so equal values are already adjacent and groupby finds each run.
+    merges = {}
+    for column_idx, justify in MERGE_COLUMNS.items():
+        runs = []
+        first_row = 2  # Row 1 are headers
+        for _, group in groupby(rows, key=itemgetter(column_idx - 1)):
+            last_row = first_row + sum(1 for _ in group) - 1
+            runs.append((first_row, last_row))
+            first_row = last_row + 1
+        merges[column_idx] = (justify, runs)
+    return merges
+
+# Function to write the unformatted sheet without building it in memory first
+def write_excel_streaming(output_file, sheets):
+    # sheets maps sheet name -> (column headers, row tuples).
+    # constant_memory flushes each row to disk as soon as the next one starts, so rows must be written in order.
+    workbook = xlsxwriter.Workbook(output_file, {"constant_memory": True})
+    for sheet_name, (columns, rows) in sheets.items():
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, columns)
+        for row_idx, row in enumerate(rows, start=1):
+            worksheet.write_row(row_idx, 0, row)
+    workbook.close()
+
+# Function to run write_excel_streaming on a background thread, fed batches of rows through a queue
+def start_background_writer(output_file, columns):
+    # Returns (put, finish): put(rows) queues a batch of row tuples, finish() waits for the workbook to be closed.
+    # The queue is bounded so a slow disk applies back-pressure instead of buffering every row twice.
+    batches = queue.Queue(maxsize=WRITE_QUEUE_BATCHES)
+    errors = []
+    end_seen = False
+
+    def queued_rows():
+        nonlocal end_seen
+        while (batch := batches.get()) is not None:
+            yield from batch
+        end_seen = True
+
+    def run():
+        try:
+            write_excel_streaming(output_file, {"Sheet1": (columns, queued_rows())})
+        except Exception as e:
+            errors.append(e)
+            # If the writer died before the end marker (e.g. bad row) keep draining so the producer never blocks.
+            # If it died after (workbook.close() failing to create the file) the marker is gone, so there's nothing to wait for.
+            if not end_seen:
+                while batches.get() is not None:
+                    pass
+
+    # Daemon so a parse error in the main thread exits instead of waiting on a writer that never gets its end marker
+    thread = threading.Thread(target=run, name="excel-writer", daemon=True)
+    thread.start()
+
+    def finish():
+        batches.put(None)  # End-of-rows marker
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    return batches.put, finish
+
 # Excel formatting function to make the spreadsheet pretty
-def format_excel(output_file):
-    wb = load_workbook(output_file)
-    ws = wb.active
+# Formats are applied while the cells are written, so every cell is written exactly once
+def write_excel_formatted(output_file, rows, merges):
+    # Not constant_memory: merge_range fills later rows, which constant_memory would flush past.
+    workbook = xlsxwriter.Workbook(output_file)
+    ws = workbook.add_worksheet("Sheet1")
 
     # Bold & enlarge headers
-    header_font = Font(bold=True, size=14)
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center", vertical="center")
+    header_format = workbook.add_format({"bold": True, "font_size": 14, "align": "center", "valign": "vcenter"})
+    ws.write_row(0, 0, COLUMNS, header_format)
 
-    # Auto-size column widths
-    for col in ws.columns:
-        max_length = 0
-        col_letter = get_column_letter(col[0].column)
-        for cell in col:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[col_letter].width = max_length + 3
+    # Longest text per column, tracked as the cells are written (starts at the header length)
+    widths = [len(header) for header in COLUMNS]
+
+    # Columns that aren't merged are written plain, one column at a time
+    merged_cols = {column_idx - 1 for column_idx in merges}  # xlsxwriter rows/columns are 0-based
+    for col in range(len(COLUMNS)):
+        if col not in merged_cols:
+            values = [row[col] for row in rows]
+            widths[col] = max(widths[col], max(map(len, values), default=0))
+            ws.write_column(1, col, values)
 
     # Merge cells for repeated values in columns (vertically). Only for PIDs and TIDs including descriptions.
-    def merge_cells(column_idx, justify="center"):
-        merge_start = None # Stores the row index where merging should begin
-        last_value = None # Tracks the last cell's value to determine whether merging should happen
-        
-        # Iterates through all rows starting from row 2 because row 1 are headers
-        for row in range(2, ws.max_row + 1): # ws.max_row + 1 to make sure it gets all rows
-            # Gets value of current cell
-            cell_value = ws.cell(row=row, column=column_idx).value
-            # Sets alignment
-            ws.cell(row=row, column=column_idx).alignment = Alignment(horizontal=justify, vertical="center")
-            
-            # If current row/cell matches the previous row/cell's value
-            if cell_value == last_value:
-                # If merge_start is none, set it to the previous row which means a duplicate was found and should be merged.
-                if merge_start is None:
-                    merge_start = row - 1
-            # If the current row/cell is different from the last value  
+    # Runs are precomputed by merge_runs(); formats are created once per justification and reused
+    merge_formats = {justify: workbook.add_format({"align": justify, "valign": "vcenter"}) for justify, _ in merges.values()}
+    for column_idx, (justify, runs) in merges.items():
+        cell_format = merge_formats[justify]
+        col = column_idx - 1
+        for first_row, last_row in runs:
+            value = rows[first_row - 2][col]  # Excel row 2 is parsed row 0
+            widths[col] = max(widths[col], len(value))  # Every cell in a run holds the same value
+            if last_row > first_row:
+                ws.merge_range(first_row - 1, col, last_row - 1, col, value, cell_format)
             else:
-                # If merge_start is not None, it means a mergeable group was found, so merge the cells.
-                if merge_start is not None:
-                    ws.merge_cells(start_row=merge_start, start_column=column_idx, end_row=row - 1, end_column=column_idx)
-                    merge_start = None  # Reset merge_start to None for the next group.
-                last_value = cell_value # Update last_value to the current cell_value.   
-        
-        # If the last rows contain the same value, merge them.
-        if merge_start is not None:
-            ws.merge_cells(start_row=merge_start, start_column=column_idx, end_row=ws.max_row, end_column=column_idx)
-
-    # Apply merging to relevant columns
-    merge_cells(1, "center")  # Property ID (PID)
-    merge_cells(2, "left")    # Property Description
-    merge_cells(3, "center")  # Threat ID (TID)
-    merge_cells(4, "left")    # Threat Description
-    merge_cells(6, "center")  # Mitigation ID (MID)
-
-    wb.save(output_file)
-    print(f"Formatted Excel saved as {output_file}")
+                ws.write(first_row - 1, col, value, cell_format)
+
+    # Auto-size column widths
+    for col_idx, width in enumerate(widths):
+        ws.set_column(col_idx, col_idx, width + 3)
+
+    workbook.close()
 
 # Main function to fetch, process, and save MITRE EMB3D data.
 def main():
@@ -202,25 +406,43 @@ def main():
 
     # Load JSON data based on user choice
     if choice == "2":
-        threats_json = fetch_json_from_github(THREATS_JSON_URL)
-        mitigations_json = fetch_json_from_github(MITIGATIONS_JSON_URL)
-        properties_json = fetch_json_from_github(PROPERTIES_JSON_URL)
+        # Download all three files at once so the wait is the slowest request rather than the sum
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            threats_raw, mitigations_raw, properties_raw = executor.map(fetch_from_github, [THREATS_JSON_URL, MITIGATIONS_JSON_URL, PROPERTIES_JSON_URL])
     else:
-        threats_json = load_local_json(input("Enter path to threats.json: ").strip())
-        mitigations_json = load_local_json(input("Enter path to mitigations.json: ").strip())
-        properties_json = load_local_json(input("Enter path to properties.json: ").strip())
-    
-    # Calls the parsing functions and stores the dictionaries in a list
-    parsed_data = parse_threats(threats_json, parse_mitigations(mitigations_json), parse_properties(properties_json))
+        threats_raw = load_local_file(input("Enter path to threats.json: ").strip())
+        mitigations_raw = load_local_file(input("Enter path to mitigations.json: ").strip())
+        properties_raw = load_local_file(input("Enter path to properties.json: ").strip())
 
+    # Threats are fully parsed; properties and mitigations stay raw so parse_properties/parse_mitigations can stream them.
+    # Results are cached on disk by input content, so unchanged inputs skip parsing entirely.
+    raw_inputs = (threats_raw, mitigations_raw, properties_raw)
+    
     output_file = "emb3d_mapping.xlsx"
 
-    # Converts the parsed_data into a Pandas dataframe to be saved as excel
-    pd.DataFrame(parsed_data).to_excel(output_file, index=False, engine="openpyxl")
+    # -Normalized writes Properties, Threats and Mitigations sheets linked by ID instead of the flattened mapping
+    if "-Normalized" in sys.argv:
+        sheets, _ = cached_parse("normalized", raw_inputs, lambda: parse_threats_normalized(decode_json(threats_raw), parse_mitigations(mitigations_raw), parse_properties(properties_raw)))
+        write_excel_streaming(output_file, {name: (NORMALIZED_COLUMNS[name], rows) for name, rows in sheets.items()})
+        print(f"Normalized Excel saved as {output_file}")
+        return
 
-    # If the -Format flag is found as an arg call the excel formatting function
-    if "-Format" in sys.argv:
-        format_excel(output_file)
+    # Without formatting nothing needs to be touched after it's written, so stream the rows straight out.
+    # A background thread writes each threat's rows while the next ones are still being parsed.
+    if "-Format" not in sys.argv:
+        put_rows, finish_writing = start_background_writer(output_file, COLUMNS)
+        parsed_data, cache_hit = cached_parse("flat", raw_inputs, lambda: parse_threats(decode_json(threats_raw), parse_mitigations(mitigations_raw), parse_properties(properties_raw), on_rows=put_rows))
+        if cache_hit:
+            put_rows(parsed_data)  # Nothing was streamed while parsing, hand over every row at once
+        finish_writing()
+        return
+
+    # Calls the parsing functions and stores the row tuples in a list
+    parsed_data, _ = cached_parse("flat", raw_inputs, lambda: parse_threats(decode_json(threats_raw), parse_mitigations(mitigations_raw), parse_properties(properties_raw)))
+
+    # Format while writing: merge runs are found up front, column widths are tracked during the write
+    write_excel_formatted(output_file, parsed_data, merge_runs(parsed_data))
+    print(f"Formatted Excel saved as {output_file}")
 
 if __name__ == "__main__":
     main()
@@ -19,12 +19,18 @@ Usage
 -----
     python3 build_emb3d_csv.py                # emb3d_mapping.csv
     python3 build_emb3d_csv.py -o my.csv      # custom output name
+    python3 build_emb3d_csv.py --no-cache     # ignore the on-disk HTTP cache
+    python3 build_emb3d_csv.py -t 64          # more concurrent downloads
+    python3 build_emb3d_csv.py -p 0           # no parser processes (low-RAM systems)
 
 Dependencies
 ------------
     • requests
     • beautifulsoup4
+    • lxml
+    • orjson
     • tqdm
+    • requests-cache (optional; caches pages on disk between runs)
 
 License
 -------
@@ -35,104 +41,253 @@ MITRE EMB3D™ content is © MITRE and used under its Terms of Use.
 # ────────────────────────────────────────────────────────────────────────────────
 # Standard-library imports
 # ────────────────────────────────────────────────────────────────────────────────
+import os                                  # CPU count for the parse pool
+import multiprocessing                     # Start method for the parse pool
 import csv                                 # CSV file generation
 import re                                  # Regular-expression helpers
+from html import unescape                  # Decode &amp; etc. in regex matches
 import time                                # Sleep for exponential back-off
 import argparse                            # Parse command-line flags
 from pathlib import Path                   # Filesystem-safe path objects
-from concurrent.futures import ThreadPoolExecutor   # Parallel web requests
+from concurrent.futures import ThreadPoolExecutor, as_completed  # Parallel web requests
+from concurrent.futures import Executor, ProcessPoolExecutor     # Parallel HTML parsing
+from contextlib import nullcontext         # Stand-in when the parse pool is disabled
+from typing import Optional                # Optional executor/session values
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Third-party imports
 # ────────────────────────────────────────────────────────────────────────────────
+import orjson                              # Fast JSON decoding
 import requests                            # HTTP/HTTPS client
-from bs4 import BeautifulSoup              # HTML parsing
+from requests.adapters import HTTPAdapter  # Connection-pool sizing
+from bs4 import BeautifulSoup, SoupStrainer # HTML parsing
 from tqdm import tqdm                      # Progress bars
 
+# Optional: on-disk HTTP cache so re-runs skip the network entirely
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None  # type: ignore
+
 # ────────────────────────────────────────────────────────────────────────────────
 # Constants
 # ────────────────────────────────────────────────────────────────────────────────
 RAW_BASE     = "https://raw.githubusercontent.com/mitre/emb3d/main"  # GitHub raw content
 MAPPING_PATH = "_data/threats_properties_mitigations_mappings.json"  # JSON map in repo
-THREADS      = 12                               # ThreadPool parallelism
+THREADS      = 32                               # ThreadPool parallelism (I/O-bound)
+PROCS        = os.cpu_count() or 1              # ProcessPool parallelism (CPU-bound parsing)
+# Parse workers start while download threads are mid-request: fork would copy
+# their locks and SSL state, so start them from a clean process instead
+MP_CONTEXT   = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
 RETRY        = 3                                # Max HTTP retry attempts
+ENCODING     = "utf-8"                          # GitHub raw pages are always UTF-8
+CACHE_FILE   = "emb3d_http_cache.sqlite"        # requests-cache database
+CACHE_TTL    = 86400                            # Seconds before a cached page is refetched
+BATCH_ROWS   = 1024                             # CSV rows buffered per writerows() call
+WRITE_BUFFER = 1 << 20                          # 1 MiB output buffer (fewer write syscalls)
+
+# Only headings, lists and paragraphs are ever read; skip building the rest of the DOM
+STRAINER     = SoupStrainer(["h1", "h2", "h3", "h4", "ul", "p"])
+
+def make_session(cache: bool = True, pool: int = THREADS) -> requests.Session:
+    """Return a keep-alive session (disk-cached when requests-cache is installed).
+
+    *pool* must be >= the number of worker threads, otherwise urllib3 makes
+    the extra threads wait for a free connection.
+    """
+    if requests_cache is not None:               # Cached: re-runs are network-free
+        session = requests_cache.CachedSession(CACHE_FILE, backend="sqlite",
+                                               expire_after=CACHE_TTL if cache else 0)
+    else:                                        # Plain pooled session
+        session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=pool, pool_maxsize=pool,
+                                          max_retries=0))  # Retries handled by fetch()
+    session.headers.update({"Accept-Encoding": "gzip", "User-Agent": "emb3d-builder"})
+    return session
+
+# One session shared by all workers: reuses TCP/TLS connections, gzip bodies.
+# Built on first fetch, not at import, so parse workers (which re-import this
+# module) never open the HTTP cache.
+SESSION: Optional[requests.Session] = None
+
+# Heading-id and identifier patterns, compiled once instead of on every page
+RX_DESC     = re.compile(r"threat[-_ ]?description", re.I)    # Threat description heading
+RX_POC      = re.compile(r"proof[-_ ]?of[-_ ]?concept", re.I)  # PoC heading
+RX_CVE      = re.compile(r"\bcve\b", re.I)                     # CVE heading
+RX_CWE      = re.compile(r"\bcwe\b", re.I)                     # CWE heading
+RX_MIT_DESC = re.compile(r"^description$", re.I)              # Mitigation description heading
+RX_MAPPING  = re.compile(r"mappings?", re.I)                  # Regulatory mappings heading
+RX_IDS      = re.compile(r"(CVE-\d{4}-\d{4,7})|(CWE-\d+)")     # Either identifier, one scan
+
+# Cheap byte-level pre-checks: a page with none of these has nothing worth parsing
+THREAT_HINTS = re.compile(rb"CVE-|CWE-|proof[-_ ]?of[-_ ]?concept|threat[-_ ]?description", re.I)
+MITIG_HINTS  = re.compile(rb'id="description"|id="[^"]*mappings?', re.I)  # Heading ids, not page text
+EMPTY_THREAT = {"description": "", "poc": "", "cve": "", "cwe": ""}
+EMPTY_MITIG  = {"description": "", "regs": ""}
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Helper Functions
 # ────────────────────────────────────────────────────────────────────────────────
-def fetch(url: str) -> str:
-    """Return text of *url* with exponential back-off + retry."""
+def fetch(url: str) -> bytes:
+    """Return raw body of *url* with exponential back-off + retry."""
+    global SESSION
+    if SESSION is None:                          # First call (the serial mapping fetch)
+        SESSION = make_session()
     for attempt in range(1, RETRY + 1):          # Try up to RETRY times
-        r = requests.get(url, timeout=30)        # Issue GET request
+        r = SESSION.get(url, timeout=30)         # Issue GET on pooled connection
         if r.ok:                                 # Success -> return body
-            return r.text
+            return r.content                     # Raw bytes (decoded by parser)
         wait = 2 ** attempt                      # Back-off seconds
         tqdm.write(f"[warn] {url} -> {r.status_code}  (retry {attempt}/{RETRY} in {wait}s)")
         time.sleep(wait)                         # Sleep before next attempt
     r.raise_for_status()                         # All retries failed -> raise
 
-def extract_ids(lines: list[str], pattern: str) -> list[str]:
-    """Return list of regex *pattern* matches (e.g., CVE-IDs) from lines."""
-    rx = re.compile(pattern)                     # Compile regex once
-    return [m.group(0) for txt in lines if (m := rx.search(txt))]  # Keep matches only
+def cve_cwe_ids(cve_text: str, cwe_text: str) -> tuple[list[str], list[str]]:
+    """Return (CVEs in *cve_text*, CWEs in *cwe_text*), de-duplicated in page order."""
+    split = len(cve_text)                        # Matches before this offset are CVE-list ones
+    cves: dict[str, None] = {}                   # Ordered sets
+    cwes: dict[str, None] = {}
+    for m in RX_IDS.finditer(f"{cve_text}\n{cwe_text}"):  # One scan over both lists
+        if m.lastindex == 1:                     # CVE: only from the CVE list
+            if m.start() < split:
+                cves[m.group()] = None
+        elif m.start() > split:                  # CWE: only from the CWE list
+            cwes[m.group()] = None
+    return list(cves), list(cwes)
+
+def squash_ws(text: str) -> str:
+    """Collapse every whitespace run to one space and trim (one rule for both parse paths)."""
+    return " ".join(text.split())
 
 def li_to_text(li) -> str:
     """Convert <li> to 'Link Text (URL)' or plain text when no anchor."""
     a = li.find("a", href=True)                  # Find first hyperlink
     if a:                                        # If hyperlink exists
-        return f"{a.get_text(' ', strip=True)} ({a['href']})"  # Return combined string
-    return li.get_text(" ", strip=True)          # Else return raw text
+        return f"{squash_ws(' '.join(a.stripped_strings))} ({a['href']})"  # Return combined string
+    return squash_ws(" ".join(li.stripped_strings))  # Else return raw text
+
+def find_hdr(soup, rx: re.Pattern):
+    """Return first element whose id matches *rx* (hyphen/underscore/space variants)."""
+    return soup.find(id=rx)                      # bs4 applies rx.search to the id
+
+def list_under(soup, rx: re.Pattern) -> list[str]:
+    """Return list items under the heading whose id matches *rx*."""
+    hdr = find_hdr(soup, rx)                     # Locate heading node
+    if not hdr:                                  # If not found → return empty
+        return []
+    ul = hdr.find_next("ul")                     # Next <ul> after heading
+    return [li_to_text(li)                       # Convert each <li> to text/URL
+            for li in ul.find_all("li", recursive=False)] if ul else []
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Regex fast path (raw HTML -> fields, no DOM)
+# ────────────────────────────────────────────────────────────────────────────────
+def section_rx(id_regex: str) -> re.Pattern:
+    """Compile 'element whose id matches *id_regex*, then its next <ul>' pattern."""
+    return re.compile(rf'id="[^"]*{id_regex}[^"]*"[^>]*>.*?<ul\b[^>]*>(.*?)</ul>', re.I | re.S)
+
+HDR_DESC    = re.compile(r'id="[^"]*threat[-_ ]?description[^"]*"[^>]*>.*?<p\b[^>]*>(.*?)</p>',
+                         re.I | re.S)                        # Threat description paragraph
+MIT_DESC    = re.compile(r'id="description"[^>]*>.*?<p\b[^>]*>(.*?)</p>',
+                         re.I | re.S)                        # Mitigation description paragraph
+POC_SECTION = section_rx(RX_POC.pattern)                     # PoC bullet list
+CVE_SECTION = section_rx(RX_CVE.pattern)                     # CVE bullet list
+CWE_SECTION = section_rx(RX_CWE.pattern)                     # CWE bullet list
+MAP_SECTION = section_rx(RX_MAPPING.pattern)                 # Regulatory mappings list
+LI          = re.compile(r"<li\b[^>]*>(.*?)</li>", re.I | re.S)
+ANCHOR      = re.compile(r'<a\b[^>]*href="([^"]*)"[^>]*>(.*?)</a>', re.I | re.S)
+TAG         = re.compile(r"<[^>]+>")
+
+def html_to_text(fragment: str) -> str:
+    """Strip tags, decode entities and collapse whitespace (same as squash_ws on the soup text)."""
+    return squash_ws(unescape(TAG.sub(" ", fragment)))
+
+def items_under(section: re.Pattern, text: str, links: bool = True) -> list[str]:
+    """Return the <li> texts of the list matched by *section* (links as 'Text (URL)')."""
+    m = section.search(text)                     # Locate heading + following <ul>
+    if not m:                                    # Section missing → empty
+        return []
+    items = []
+    for li in LI.findall(m.group(1)):            # Each bullet body
+        a = ANCHOR.search(li) if links else None # First hyperlink, if wanted
+        items.append(f"{html_to_text(a.group(2))} ({unescape(a.group(1))})" if a
+                     else html_to_text(li))
+    return items
+
+def section_body(section: re.Pattern, text: str) -> str:
+    """Return the raw <ul> body matched by *section*, or '' when the section is missing."""
+    m = section.search(text)
+    return m.group(1) if m else ""
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Threat-page Parser
 # ────────────────────────────────────────────────────────────────────────────────
-def parse_threat_html(html: str) -> dict[str, str]:
+def parse_threat_html(html: bytes) -> dict[str, str]:
     """Extract description, PoC, CVE, CWE from a Threat HTML page."""
-    soup = BeautifulSoup(html, "html.parser")    # Parse HTML to tree
-
-    # Inner helper: find heading by id (handles hyphen/underscore/space variants)
-    def find_hdr(keywords: str):
-        regex = re.compile(keywords, re.I)       # Case-insensitive pattern
-        return soup.find(lambda tag: tag.has_attr("id") and regex.search(tag["id"]))
-
-    # Inner helper: return list items under heading that matches *id_regex*
-    def list_under(id_regex: str) -> list[str]:
-        hdr = find_hdr(id_regex)                 # Locate heading node
-        if not hdr:                              # If not found → return empty
-            return []
-        ul = hdr.find_next("ul")                 # Next <ul> after heading
-        return [li_to_text(li)                   # Convert each <li> to text/URL
-                for li in ul.find_all("li", recursive=False)] if ul else []
+    text = html.decode(ENCODING, errors="replace")  # Regexes run on str
+    desc = HDR_DESC.search(text)                 # Description paragraph
+    cves, cwes = cve_cwe_ids(section_body(CVE_SECTION, text),
+                             section_body(CWE_SECTION, text))  # Identifier lists
+
+    info = {
+        "description": html_to_text(desc.group(1)) if desc else "",
+        "poc": "; ".join(items_under(POC_SECTION, text)),
+        "cve": "; ".join(cves),
+        "cwe": "; ".join(cwes),
+    }
+    if any(info.values()):                       # Fast path found the page layout
+        return info
+    return parse_threat_soup(html)               # Unexpected markup → full DOM parse
+
+def parse_threat_soup(html: bytes) -> dict[str, str]:
+    """BeautifulSoup fallback for :func:`parse_threat_html`."""
+    soup = BeautifulSoup(html, "lxml", from_encoding=ENCODING,
+                         parse_only=STRAINER)    # Partial tree, C parser
 
-    desc_hdr    = find_hdr(r"threat[-_ ]?description")   # "Threat Description" heading
-    description = desc_hdr.find_next("p").get_text(" ", strip=True) if desc_hdr else ""
+    desc_hdr    = find_hdr(soup, RX_DESC)        # "Threat Description" heading
+    description = squash_ws(desc_hdr.find_next("p").get_text(" ")) if desc_hdr else ""
 
-    poc_lines = list_under(r"proof[-_ ]?of[-_ ]?concept")  # PoC bullet list
-    cve_lines = list_under(r"\bcve\b")                    # CVE bullet list
-    cwe_lines = list_under(r"\bcwe\b")                    # CWE bullet list
+    poc_lines = list_under(soup, RX_POC)         # PoC bullet list
+    cves, cwes = cve_cwe_ids("\n".join(list_under(soup, RX_CVE)),   # Same rule as the
+                             "\n".join(list_under(soup, RX_CWE)))   # regex fast path
 
     return {                                   # Dictionary for caller
         "description": description,
         "poc": "; ".join(poc_lines),           # Join PoC entries with semicolon
-        "cve": "; ".join(extract_ids(cve_lines, r"CVE-\d{4}-\d{4,7}")),
-        "cwe": "; ".join(extract_ids(cwe_lines, r"CWE-\d+")),
+        "cve": "; ".join(cves),
+        "cwe": "; ".join(cwes),
     }
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Mitigation-page Parser
 # ────────────────────────────────────────────────────────────────────────────────
-def parse_mitigation_html(html: str) -> dict[str, str]:
+def parse_mitigation_html(html: bytes) -> dict[str, str]:
     """Extract description + regulatory mappings from Mitigation HTML."""
-    soup = BeautifulSoup(html, "html.parser")    # Parse HTML
+    text = html.decode(ENCODING, errors="replace")  # Regexes run on str
+    desc = MIT_DESC.search(text)                 # Description paragraph
 
-    desc_hdr = soup.find(id=re.compile("^description$", re.I))  # Heading id="description"
-    description = desc_hdr.find_next("p").get_text(" ", strip=True) if desc_hdr else ""
+    info = {
+        "description": html_to_text(desc.group(1)) if desc else "",
+        "regs": "; ".join(items_under(MAP_SECTION, text, links=False)),
+    }
+    if any(info.values()):                       # Fast path found the page layout
+        return info
+    return parse_mitigation_soup(html)           # Unexpected markup → full DOM parse
+
+def parse_mitigation_soup(html: bytes) -> dict[str, str]:
+    """BeautifulSoup fallback for :func:`parse_mitigation_html`."""
+    soup = BeautifulSoup(html, "lxml", from_encoding=ENCODING,
+                         parse_only=STRAINER)    # Partial tree, C parser
 
-    map_hdr = soup.find(id=re.compile("mappings?", re.I))   # Heading "Mappings"
+    desc_hdr = soup.find(id=RX_MIT_DESC)                    # Heading id="description"
+    description = squash_ws(desc_hdr.find_next("p").get_text(" ")) if desc_hdr else ""
+
+    map_hdr = soup.find(id=RX_MAPPING)                      # Heading "Mappings"
     regs = []                                               # List of regulatory refs
     if map_hdr:                                             # If section exists
         ul = map_hdr.find_next("ul")                        # Next <ul>
-        regs = [li.get_text(" ", strip=True)                # Plain text bullets
+        regs = [squash_ws(" ".join(li.stripped_strings))    # Plain text bullets
                 for li in ul.find_all("li", recursive=False)] if ul else []
 
     return {                               # Return dict to caller
@@ -142,46 +297,50 @@ def parse_mitigation_html(html: str) -> dict[str, str]:
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Thin wrappers for ThreadPool call-sites
+#   Download happens in the calling thread; parsing is handed to *pool* (a
+#   ProcessPool, off the GIL) when given, otherwise done in-thread.
 # ────────────────────────────────────────────────────────────────────────────────
-def threat_worker(tid: str) -> dict[str, str]:
+def threat_worker(tid: str, pool: Optional[Executor] = None) -> dict[str, str]:
     """Download + parse a single Threat page."""
-    return parse_threat_html(fetch(f"{RAW_BASE}/threats/{tid}.html"))
+    html = fetch(f"{RAW_BASE}/threats/{tid}.html")
+    if not THREAT_HINTS.search(html):            # No sections on page → skip parse
+        return dict(EMPTY_THREAT)
+    return pool.submit(parse_threat_html, html).result() if pool else parse_threat_html(html)
 
-def mitigation_worker(mid: str) -> dict[str, str]:
+def mitigation_worker(mid: str, pool: Optional[Executor] = None) -> dict[str, str]:
     """Download + parse a single Mitigation page."""
-    return parse_mitigation_html(fetch(f"{RAW_BASE}/mitigations/{mid}.html"))
+    html = fetch(f"{RAW_BASE}/mitigations/{mid}.html")
+    if not MITIG_HINTS.search(html):             # No sections on page → skip parse
+        return dict(EMPTY_MITIG)
+    return pool.submit(parse_mitigation_html, html).result() if pool else parse_mitigation_html(html)
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Main driver
 # ────────────────────────────────────────────────────────────────────────────────
-def build_csv(out_csv: Path) -> None:
+def build_csv(out_csv: Path, threads: int = THREADS, procs: int = PROCS) -> None:
     """High-level workflow: download JSON, scrape pages, write CSV."""
-    mapping_json = requests.get(f"{RAW_BASE}/{MAPPING_PATH}", timeout=30).json()  # Load master JSON
-
-    # Build PID→text fallback for properties missing 'text' field
-    property_lookup = {p["id"]: p["text"]
-                       for t in mapping_json["threats"]
-                       for p in t["properties"]
-                       if "text" in p}
-
-    # Unique TIDs and MIDs for one-time page fetch
-    tids = {t["id"] for t in mapping_json["threats"]}
-    mids = {m["id"] for t in mapping_json["threats"] for m in t["mitigations"]}
+    mapping_json = orjson.loads(fetch(f"{RAW_BASE}/{MAPPING_PATH}"))  # Load master JSON
+
+    # One pass over the threats builds all lookups:
+    #   PID→text fallback for properties missing 'text' field,
+    #   unique TIDs and MIDs for one-time page fetch,
+    #   MID→capitalised level (a mitigation property, not a per-row one)
+    property_lookup: dict[str, str] = {}
+    level_lookup: dict[str, str] = {}
+    tids: set[str] = set()
+    mids: set[str] = set()
+    for t in mapping_json["threats"]:
+        tids.add(t["id"])
+        for p in t["properties"]:
+            if "text" in p:
+                property_lookup[p["id"]] = p["text"]
+        for m in t["mitigations"]:
+            mids.add(m["id"])
+            if m["id"] not in level_lookup:
+                level_lookup[m["id"]] = m["level"].capitalize()
 
     tqdm.write(f"Fetching {len(tids)} threats & {len(mids)} mitigations …")
 
-    # Parallel download + parse using ThreadPool
-    with ThreadPoolExecutor(max_workers=THREADS) as exe:
-        threat_info = {tid: fut.result()                     # Map TID→info
-                       for fut, tid in tqdm(
-                           {exe.submit(threat_worker, tid): tid for tid in tids}.items(),
-                           desc="Threats", total=len(tids))}
-
-        mitig_info  = {mid: fut.result()                     # Map MID→info
-                       for fut, mid in tqdm(
-                           {exe.submit(mitigation_worker, mid): mid for mid in mids}.items(),
-                           desc="Mitigations", total=len(mids))}
-
     # CSV header definition
     header = [
         "Property ID", "Property text",
@@ -191,46 +350,63 @@ def build_csv(out_csv: Path) -> None:
         "Mitigation Description", "Mitigation Regulatory Mapping"
     ]
 
-    # Open destination file for writing
-    with out_csv.open("w", newline="", encoding="utf-8") as fh:
-        writer = csv.DictWriter(fh, fieldnames=header)  # CSV writer w/header order
-        writer.writeheader()                            # Emit header row
-
-        # Walk nested JSON structure to flatten into rows
-        for threat in mapping_json["threats"]:          # Loop over each threat block
-            tid     = threat["id"]                      # Current Threat ID
-            t_extra = threat_info.get(tid, {})          # Scraped threat metadata
-
-<<<<<<< HEAD
-                    row = {
-                        "Property ID": prop["id"],
-                        "Property text": prop.get("text", ""),
-=======
-            for prop in threat["properties"]:           # Loop each property for threat
-                pid       = prop["id"]                  # Property ID
-                prop_text = prop.get("text") or property_lookup.get(pid, "")  # Reliable text
->>>>>>> c8bfd95188c4006f3779484ff3bcd8827af9b181
-
-                for mitig in threat["mitigations"]:     # Loop each linked mitigation
-                    mid      = mitig["id"]              # Mitigation ID
-                    m_extra  = mitig_info.get(mid, {})  # Scraped mitigation metadata
-
-                    # Write flattened CSV row
-                    writer.writerow({
-                        "Property ID":   pid,
-                        "Property text": prop_text,
-                        "Threat ID":     tid,
-                        "Threat text":   threat["text"],
-                        "Threat Description":     t_extra.get("description", ""),
-                        "Threat Proof of Concept": t_extra.get("poc", ""),
-                        "CVE":                    t_extra.get("cve", ""),
-                        "CWE":                    t_extra.get("cwe", ""),
-                        "Mitigation ID":   mid,
-                        "Mitigation Text": mitig["text"],
-                        "Mitigation Level": mitig["level"].capitalize(),
-                        "Mitigation Description":        m_extra.get("description", ""),
-                        "Mitigation Regulatory Mapping": m_extra.get("regs", ""),
-                    })
+    # Parallel download (ThreadPool) + parse (ProcessPool, unless procs == 0)
+    with ThreadPoolExecutor(max_workers=threads) as exe, \
+         (ProcessPoolExecutor(max_workers=procs, mp_context=MP_CONTEXT)
+          if procs > 0 else nullcontext()) as pool:
+        # Queue every page up front: mitigations first (few, and reused by every
+        # threat), then threats, which are consumed as the CSV is written
+        mitig_futs  = {exe.submit(mitigation_worker, mid, pool): mid for mid in mids}
+        threat_futs = {tid: exe.submit(threat_worker, tid, pool) for tid in tids}
+
+        # Collect in completion order so one slow page never stalls the rest
+        mitig_info  = {mitig_futs[fut]: fut.result()         # Map MID→info
+                       for fut in tqdm(as_completed(mitig_futs),
+                                       desc="Mitigations", total=len(mitig_futs))}
+
+        tmp_csv = out_csv.with_name(out_csv.name + ".tmp")  # Sibling so os.replace stays atomic
+        try:
+            # Write next to the destination while threat pages are still arriving;
+            # the previous CSV is only replaced once every page has been written
+            with tmp_csv.open("w", newline="", encoding="utf-8", buffering=WRITE_BUFFER) as fh:
+                writer = csv.writer(fh)                     # Positional rows, column order = header
+                writer.writerow(header)                     # Emit header row
+                rows = []                                   # Pending rows for writerows()
+
+                # Walk nested JSON structure to flatten into rows. Threats are taken in
+                # mapping order (waiting only on the one needed next) so the CSV stays
+                # deterministic while later pages download in the background.
+                for threat in tqdm(mapping_json["threats"], desc="Threats"):
+                    tid     = threat["id"]                  # Current Threat ID
+                    t_extra = threat_futs.pop(tid).result() # Scraped threat metadata (freed once written)
+
+                    # Columns constant across this threat's property x mitigation product
+                    threat_cols = (tid, threat["text"],
+                                   t_extra.get("description", ""), t_extra.get("poc", ""),
+                                   t_extra.get("cve", ""), t_extra.get("cwe", ""))
+                    mitig_cols = []                         # One column tuple per mitigation
+                    for mitig in threat["mitigations"]:
+                        mid     = mitig["id"]               # Mitigation ID
+                        m_extra = mitig_info.get(mid, {})   # Scraped mitigation metadata
+                        mitig_cols.append((mid, mitig["text"], level_lookup[mid],
+                                           m_extra.get("description", ""), m_extra.get("regs", "")))
+
+                    for prop in threat["properties"]:       # Loop each property for threat
+                        pid       = prop["id"]              # Property ID
+                        prop_text = prop.get("text") or property_lookup.get(pid, "")  # Reliable text
+                        head      = (pid, prop_text) + threat_cols  # Property + threat columns
+
+                        for tail in mitig_cols:             # Loop each linked mitigation
+                            rows.append(head + tail)        # Queue flattened CSV row
+                            if len(rows) >= BATCH_ROWS:     # Flush a full batch
+                                writer.writerows(rows)
+                                rows.clear()
+
+                writer.writerows(rows)                      # Flush final partial batch
+        except BaseException:
+            tmp_csv.unlink(missing_ok=True)                 # Drop the partial file, keep the old CSV
+            raise
+        os.replace(tmp_csv, out_csv)                        # Swap in the complete CSV
 
     tqdm.write(f"[ok] Wrote {out_csv} ({out_csv.stat().st_size/1024:.1f} KiB)")
 
@@ -241,4 +417,13 @@ if __name__ == "__main__":
     ap = argparse.ArgumentParser(description="Build MITRE-EMB3D mapping CSV")  # Argument parser
     ap.add_argument("-o", "--output", default="data/emb3d_mapping.csv",             # Output path flag
                     type=Path, help="CSV file to write (default: emb3d_mapping.csv)")
-    build_csv(ap.parse_args().output)                                          # Delegate to main workflow
+    ap.add_argument("--no-cache", action="store_true",                            # Bypass HTTP cache
+                    help=f"Refetch every page instead of reusing {CACHE_FILE}")
+    ap.add_argument("-t", "--threads", default=THREADS, type=int,                 # Worker count flag
+                    help=f"Concurrent page downloads (default: {THREADS})")
+    ap.add_argument("-p", "--procs", default=PROCS, type=int,                     # Parse pool size flag
+                    help=f"Parser processes, 0 = parse in download threads (default: {PROCS})")
+    args = ap.parse_args()
+    if args.no_cache or args.threads != THREADS:                               # Re-size / bypass cache
+        SESSION = make_session(cache=not args.no_cache, pool=args.threads)
+    build_csv(args.output, args.threads, args.procs)                           # Delegate to main workflow
@@ -20,12 +20,14 @@ Features
 * **Auto-discovers the newest STIX file** in
   `https://github.com/mitre/emb3d/tree/main/assets/` (version-aware).
 * **Zero external deps** beyond the Python 3 stdlib
-  (- optional `packaging` for nicer version sorting).
+  (- optional `packaging` for nicer version sorting,
+   - optional `orjson` for faster STIX bundle parsing).
 
 Usage
 -----
     python3 build_emb3d_csv_from_stix.py                # → emb3d_mapping.csv
     python3 build_emb3d_csv_from_stix.py -o out.csv     # custom output name
+    python3 build_emb3d_csv_from_stix.py -j 4           # render rows in 4 processes
 
 License
 -------
@@ -36,10 +38,12 @@ MITRE EMB3D™ content is © MITRE and used under its Terms of Use.
 from __future__ import annotations
 
 import argparse
-import csv
 import json
 import re
 import sys
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import urllib.request as urlreq
 from urllib.error import HTTPError, URLError
@@ -50,15 +54,31 @@ try:
 except ImportError:
     Version = None  # type: ignore
 
+# optional, for faster JSON decoding; if unavailable, falls back to the stdlib
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
 ASSETS_API = "https://api.github.com/repos/mitre/emb3d/contents/assets"
 SEMVER_RX = re.compile(r"emb3d-stix-(\d+\.\d+\.\d+)\.json")
+CVE_CWE_RX = re.compile(r"(CVE-\d{4}-\d+)|(CWE-\d+)")
+CSV_EOL = b"\r\n"     # same line terminator the csv module writes
+WRITE_BUFFER = 1 << 20  # 1 MiB output buffer
+CHUNKS_PER_JOB = 4      # relationship slices per --jobs worker, evens out uneven threats
+
+CSV_HEADER = [
+    "Property ID", "Property text",
+    "Threat ID", "Threat text", "Threat Description", "Threat Proof of Concept", "CVE", "CWE",
+    "Mitigation ID", "Mitigation Text", "Mitigation Level", "Mitigation Description", "Mitigation Regulatory Mapping",
+]
 
 
 def latest_stix_info() -> tuple[str, str]:
     """Return (filename, download_url) of the newest STIX JSON in /assets."""
     try:
         with urlreq.urlopen(ASSETS_API, timeout=30) as resp:
-            entries = json.load(resp)
+            entries = _loads(resp.read())
     except (HTTPError, URLError) as e:
         sys.exit(f"[fatal] Cannot list assets/: {e}")
 
@@ -89,7 +109,7 @@ def load_stix_bundle(url: str) -> dict:
     """Download & parse the STIX bundle at `url`."""
     try:
         with urlreq.urlopen(url, timeout=60) as resp:
-            return json.load(resp)
+            return _loads(resp.read())
     except (HTTPError, URLError) as e:
         sys.exit(f"[fatal] Unable to fetch STIX bundle: {e}")
 
@@ -102,29 +122,107 @@ def split_objects(objects: list[dict]) -> tuple[dict, dict, dict, list[dict]]:
       - properties (x-mitre-emb3d-property)
       - raw relationships
     """
-    vulns = {o["id"]: o for o in objects if o.get("type") == "vulnerability"}
-    mitigs = {o["id"]: o for o in objects if o.get("type") == "course-of-action"}
-    props = {o["id"]: o for o in objects if o.get("type") == "x-mitre-emb3d-property"}
-    rels = [o for o in objects if o.get("type") == "relationship"]
+    vulns: dict[str, dict] = {}
+    mitigs: dict[str, dict] = {}
+    props: dict[str, dict] = {}
+    rels: list[dict] = []
+
+    # single pass: dispatch each object to its bucket by STIX type
+    by_type = {
+        "vulnerability": vulns.__setitem__,
+        "course-of-action": mitigs.__setitem__,
+        "x-mitre-emb3d-property": props.__setitem__,
+    }
+    for o in objects:
+        otype = o.get("type")
+        if otype == "relationship":
+            rels.append(o)
+        else:
+            store = by_type.get(otype)
+            if store:
+                store(o["id"], o)
     return vulns, mitigs, props, rels
 
 
+def csv_cell(value: object) -> bytes:
+    """Encode one CSV field, quoting only when needed (csv.QUOTE_MINIMAL rules)."""
+    # same coercion as csv.writer: None is an empty field, anything else goes through str()
+    if value is None:
+        return b""
+    if not isinstance(value, str):
+        value = str(value)
+    if '"' in value or "," in value or "\n" in value or "\r" in value:
+        return b'"' + value.replace('"', '""').encode("utf-8") + b'"'
+    return value.encode("utf-8")
+
+
+def csv_row(fields: list[object]) -> bytes:
+    """Encode a full CSV record, line terminator included."""
+    return b",".join([csv_cell(f) for f in fields]) + CSV_EOL
+
+
+def parse_poc(text: str) -> str:
+    """Turn Markdown `- [text](url)` bullets into 'text (url); …'."""
+    out = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line.startswith("- ["):
+            continue
+        name, sep, rest = line[3:].partition("](")
+        url, end, _ = rest.partition(")")
+        if sep and end and name and url and "]" not in name:
+            out.append(f"{name} ({url})")
+    return "; ".join(out)
+
+
+def parse_regs(text: str) -> str:
+    """Turn Markdown `- item` bullets into 'item; …'."""
+    # lstrip("- ") also drops repeated markers ("- - item" → "item"), as the baseline did
+    return "; ".join([
+        line.lstrip("- ").strip()
+        for line in map(str.strip, text.splitlines())
+        if line.startswith("- ")
+    ])
+
+
+def parse_cve_cwe(cve_text: str, cwe_text: str) -> tuple[str, str]:
+    """
+    Return ('CVE-…; …', 'CWE-…; …') with a single regex pass over both fields.
+    CVEs are only taken from `cve_text` and CWEs only from `cwe_text`.
+    """
+    split = len(cve_text)
+    cves, cwes = [], []
+    for m in CVE_CWE_RX.finditer(f"{cve_text}\n{cwe_text}"):
+        if m.lastindex == 1:
+            if m.start() < split:
+                cves.append(m.group())
+        elif m.start() > split:
+            cwes.append(m.group())
+    return "; ".join(cves), "; ".join(cwes)
+
+
 def build_lookup(objs: dict[str, dict], field: str) -> dict[str, str]:
     """Make a lookup dict {id: obj[field] or ''} for quick access."""
     return {oid: o.get(field, "") or "" for oid, o in objs.items()}
 
 
-def write_csv(path: Path, bundle: dict) -> None:
-    """Extract all PID→TID→MID rows and write the CSV to `path`."""
+def row_builder(bundle: dict) -> tuple[list[dict], Callable[[list[dict]], Iterator[list[str]]]]:
+    """
+    Index `bundle` and return (mitigates relationships, rows), where
+    rows(rels) yields the CSV rows for any slice of those relationships.
+    """
     vulns, mitigs, props, rels = split_objects(bundle.get("objects", []))
 
-    # build threat → [property IDs] from 'relates-to' relationships
-    prop_map: dict[str, list[str]] = {}
+    # one pass over relationships: build threat → [property IDs] from 'relates-to'
+    # and keep the 'mitigates' ones (in bundle order) for row emission
+    prop_map: defaultdict[str, list[str]] = defaultdict(list)
+    mitigates_rels: list[dict] = []
     for r in rels:
-        if r.get("relationship_type") == "relates-to":
-            pid = r["source_ref"]
-            tid = r["target_ref"]
-            prop_map.setdefault(tid, []).append(pid)
+        rtype = r.get("relationship_type")
+        if rtype == "mitigates":
+            mitigates_rels.append(r)
+        elif rtype == "relates-to":
+            prop_map[r["target_ref"]].append(r["source_ref"])
 
     # lookups for STIX custom fields
     t_desc = build_lookup(vulns, "description")
@@ -136,71 +234,107 @@ def write_csv(path: Path, bundle: dict) -> None:
     m_regs_raw = build_lookup(mitigs, "x_mitre_emb3d_mitigation_IEC_62443_mappings")
     m_lvl = build_lookup(mitigs, "x_mitre_emb3d_mitigation_maturity")
 
-    header = [
-        "Property ID", "Property text",
-        "Threat ID", "Threat text", "Threat Description", "Threat Proof of Concept", "CVE", "CWE",
-        "Mitigation ID", "Mitigation Text", "Mitigation Level", "Mitigation Description", "Mitigation Regulatory Mapping",
-    ]
-
-    with path.open("w", newline="", encoding="utf-8") as fh:
-        writer = csv.writer(fh)
-        writer.writerow(header)
-
-        # for every mitigation relationship, emit one row per property on that threat
+    def threat_fields(tid: str) -> tuple[str, str, str, str, str, str]:
+        """Return (id, name, description, PoC, CVEs, CWEs) for threat `tid`."""
+        tg = vulns.get(tid, {}).get
+        cves, cwes = parse_cve_cwe(t_cve_raw.get(tid, ""), t_cwe_raw.get(tid, ""))
+        return (
+            tg("x_mitre_emb3d_threat_id", ""),
+            tg("name", ""),
+            t_desc.get(tid, ""),
+            parse_poc(t_poc_raw.get(tid, "")),
+            cves,
+            cwes,
+        )
+
+    def mitig_fields(mid: str) -> tuple[str, str, str, str, str]:
+        """Return (id, name, level, description, regulatory mappings) for mitigation `mid`."""
+        mg = mitigs.get(mid, {}).get
+        return (
+            mg("x_mitre_emb3d_mitigation_id", ""),
+            mg("name", ""),
+            m_lvl.get(mid, ""),
+            m_desc.get(mid, ""),
+            parse_regs(m_regs_raw.get(mid, "")),
+        )
+
+    # many relationships share a threat or mitigation: parse each one only once
+    threat_cache: dict[str, tuple[str, str, str, str, str, str]] = {}
+    mitig_cache: dict[str, tuple[str, str, str, str, str]] = {}
+
+    # threat → [(property ID, property text)], resolved once instead of per row
+    prop_cache: dict[str, list[tuple[str, str]]] = {}
+    for tid, pids in prop_map.items():
+        prop_cache[tid] = [
+            (prop.get("x_mitre_emb3d_property_id", ""), prop.get("name", ""))
+            for prop in (props.get(pid, {}) for pid in pids)
+        ]
+
+    def rows(rels: list[dict]) -> Iterator[list[str]]:
+        """For every mitigation relationship, yield one row per property on that threat."""
+        # bind the cache lookups once instead of resolving `.get` on every relationship
+        threat_get, mitig_get, props_get = threat_cache.get, mitig_cache.get, prop_cache.get
         for r in rels:
-            if r.get("relationship_type") != "mitigates":
-                continue
-
             tid = r["target_ref"]    # vulnerability
             mid = r["source_ref"]    # course-of-action
 
-            threat = vulns.get(tid, {})
-            mitig  = mitigs.get(mid, {})
-
-            # extract threat fields
-            threat_id = threat.get("x_mitre_emb3d_threat_id", "")
-            threat_name = threat.get("name", "")
-            threat_desc = t_desc.get(tid, "")
-            # parse PoC bullets: Markdown list of [text](url)
-            poc_list = []
-            for line in t_poc_raw.get(tid, "").splitlines():
-                line = line.strip()
-                if line.startswith("- "):
-                    m = re.match(r"- \[([^\]]+)\]\(([^)]+)\)", line)
-                    if m:
-                        poc_list.append(f"{m.group(1)} ({m.group(2)})")
-            threat_poc = "; ".join(poc_list)
-            # parse CVEs & CWEs
-            cves = re.findall(r"(CVE-\d{4}-\d+)", t_cve_raw.get(tid, ""))
-            cwes = re.findall(r"(CWE-\d+)", t_cwe_raw.get(tid, ""))
-            threat_cve = "; ".join(cves)
-            threat_cwe = "; ".join(cwes)
-
-            # parse mitigation fields
-            mitig_id = mitig.get("x_mitre_emb3d_mitigation_id", "")
-            mitig_name = mitig.get("name", "")
-            mitig_lvl = m_lvl.get(mid, "")
-            mitig_desc = m_desc.get(mid, "")
-            regs = []
-            for line in m_regs_raw.get(mid, "").splitlines():
-                line = line.strip()
-                if line.startswith("- "):
-                    regs.append(line.lstrip("- ").strip())
-            mitig_regs = "; ".join(regs)
+            t = threat_get(tid)
+            if t is None:
+                t = threat_cache[tid] = threat_fields(tid)
+            m = mitig_get(mid)
+            if m is None:
+                m = mitig_cache[mid] = mitig_fields(mid)
+            threat_id, threat_name, threat_desc, threat_poc, threat_cve, threat_cwe = t
+            mitig_id, mitig_name, mitig_lvl, mitig_desc, mitig_regs = m
 
             # for each property on this threat
-            for pid in prop_map.get(tid, []):
-                prop = props.get(pid, {})
-                prop_id = prop.get("x_mitre_emb3d_property_id", "")
-                prop_text = prop.get("name", "")
-
-                writer.writerow([
+            for prop_id, prop_text in props_get(tid, ()):
+                yield [
                     prop_id, prop_text,
                     threat_id, threat_name, threat_desc, threat_poc, threat_cve, threat_cwe,
                     mitig_id, mitig_name, mitig_lvl, mitig_desc, mitig_regs,
-                ])
+                ]
+
+    return mitigates_rels, rows
+
+
+# per-process state for --jobs workers, set once by init_worker()
+_worker_rels: list[dict] = []
+_worker_rows: Callable[[list[dict]], Iterator[list[str]]] | None = None
+
+
+def init_worker(bundle: dict) -> None:
+    """ProcessPoolExecutor initializer: index the bundle once per worker."""
+    global _worker_rels, _worker_rows
+    _worker_rels, _worker_rows = row_builder(bundle)
 
-    print(f"[ok] Wrote {path} ({path.stat().st_size/1024:.1f} KiB)")
+
+def render_chunk(bounds: tuple[int, int]) -> bytes:
+    """Encode the rows for mitigates relationships [start, stop) into one blob."""
+    start, stop = bounds
+    return b"".join(map(csv_row, _worker_rows(_worker_rels[start:stop])))
+
+
+def write_csv(path: Path, bundle: dict, jobs: int = 1) -> None:
+    """Extract all PID→TID→MID rows and write the CSV to `path`."""
+    mitigates_rels, rows = row_builder(bundle)
+
+    # rows are encoded directly instead of going through csv.writer; csv_cell
+    # applies the same None/str() coercion, so output is byte-identical to the csv module's
+    with path.open("wb", buffering=WRITE_BUFFER) as fh:
+        # write() returns the byte count, so the size is known without a stat()
+        size = fh.write(csv_row(CSV_HEADER))
+        if jobs > 1 and len(mitigates_rels) > CHUNKS_PER_JOB * jobs:
+            # contiguous slices rendered in worker processes and written back
+            # in submission order, so the file matches the serial output
+            step = -(-len(mitigates_rels) // (CHUNKS_PER_JOB * jobs))
+            chunks = [(i, i + step) for i in range(0, len(mitigates_rels), step)]
+            with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=(bundle,)) as pool:
+                size += sum(map(fh.write, pool.map(render_chunk, chunks)))
+        else:
+            size += sum(map(fh.write, map(csv_row, rows(mitigates_rels))))
+
+    print(f"[ok] Wrote {path} ({size/1024:.1f} KiB)")
 
 
 if __name__ == "__main__":
@@ -213,10 +347,16 @@ if __name__ == "__main__":
         type=Path,
         help="Destination CSV file (default: emb3d_mapping.csv)"
     )
+    ap.add_argument(
+        "-j", "--jobs",
+        default=1,
+        type=int,
+        help="Worker processes for row rendering (default: 1, no pool)"
+    )
     args = ap.parse_args()
 
     fname, url = latest_stix_info()
     print(f"[info] Latest STIX bundle: {fname}\n       → {url}\n")
 
     bundle = load_stix_bundle(url)
-    write_csv(args.output, bundle)
+    write_csv(args.output, bundle, args.jobs)